@@ -1,39 +1,82 @@
 import fitz  # PyMuPDF
 import pandas as pd
-from docx import Document
-from pptx import Presentation
-from PIL import Image
-from io import BytesIO
 
-def extract_from_pdf(file):
-    doc = fitz.open(stream=file.read(), filetype="pdf")
+# Image formats browsers can show as-is; anything else is converted to PNG
+WEB_IMAGE_FORMATS = {"png", "jpeg", "jpg", "gif", "bmp", "webp"}
+
+def image_to_png(doc, page, img):
+    """Render a PDF image (JPX, JBIG2, CMYK TIFF, ...) to PNG with PyMuPDF"""
+    try:
+        pix = fitz.Pixmap(doc, img[0])
+        # PNG has no CMYK mode, so convert anything beyond RGB first
+        if pix.colorspace and pix.colorspace.n > 3:
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        return pix.tobytes("png")
+    except Exception:
+        pass
+    # Otherwise render the area the image covers on the page
+    try:
+        bbox = page.get_image_bbox(img)
+        if bbox.is_empty or bbox.is_infinite:
+            return None
+        return page.get_pixmap(clip=bbox).tobytes("png")
+    except Exception:
+        # No displayable form; the caller keeps a placeholder instead
+        return None
+
+def extract_from_pdf(file, detect_tables=True):
+    # Accept raw bytes as well as a file object, so callers that already
+    # hold the upload in memory do not have to wrap and re-read it
+    data = file if isinstance(file, (bytes, bytearray)) else file.read()
+    doc = fitz.open(stream=data, filetype="pdf")
     pages_info = []
+    # Logos and headers are usually one image object referenced from every
+    # page, so extract each xref once and share it between pages
+    images_by_xref = {}
     for page_num in range(len(doc)):
         page = doc.load_page(page_num)
         text = page.get_text()
         images = []
         for img_index, img in enumerate(page.get_images(full=True)):
             xref = img[0]
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
-            images.append(Image.open(BytesIO(image_bytes)))
-        tables = page.find_tables()
+            if xref not in images_by_xref:
+                base_image = doc.extract_image(xref)
+                image_bytes = base_image["image"]
+                if base_image["ext"] not in WEB_IMAGE_FORMATS:
+                    image_bytes = image_to_png(doc, page, img)
+                # Keep the encoded bytes; decoding to a PIL image here only for
+                # Streamlit to re-encode it again on every render is wasted work.
+                # data is None when the image could not be made displayable
+                images_by_xref[xref] = {
+                    "xref": xref,
+                    "data": image_bytes,
+                    "width": base_image["width"],
+                    "height": base_image["height"]
+                }
+            images.append(images_by_xref[xref])
         tables_data = []
-        for table in tables:
-            try:
-                df = pd.DataFrame(table.extract())
-                tables_data.append(df)
-            except:
-                pass
+        # Table detection is by far the slowest step; fast mode skips it
+        if detect_tables:
+            for table in page.find_tables():
+                try:
+                    df = pd.DataFrame.from_records(table.extract())
+                except:
+                    continue
+                # Detected regions with no cells add nothing but an empty entry
+                if not df.empty:
+                    tables_data.append(df)
         pages_info.append({"text": text, "images": images, "tables": tables_data})
     return pages_info
 
 def extract_from_docx(file):
+    # Imported on first use so sessions that never open a Word file skip it
+    from docx import Document
     doc = Document(file)
     text = "\n".join([para.text for para in doc.paragraphs])
     return {"text": text}
 
 def extract_from_pptx(file):
+    from pptx import Presentation
     prs = Presentation(file)
     slides_data = []
     for slide in prs.slides:
@@ -45,9 +88,5 @@ def extract_from_pptx(file):
     return slides_data
 
 def extract_from_excel(file):
-    xls = pd.ExcelFile(file)
-    sheets_data = {}
-    for sheet_name in xls.sheet_names:
-        df = pd.read_excel(xls, sheet_name)
-        sheets_data[sheet_name] = df
-    return sheets_data
+    # sheet_name=None reads every sheet in one call, in workbook order
+    return pd.read_excel(file, sheet_name=None)